@@ -184,7 +184,7 @@ class ScovatScript:
             at.read(a)
             bt.read(b)  # Parse profile data.
             analysis = self.Analysis()  # Results from it.
-            analysis.compare(at, bt)  # Hamming, Jaccard.
+            analysis.compare(at, bt, self.align)  # Hamming, Jaccard.
             analysis.write(output_path)  # Overwrite tmp.
 
         print("===========================ANALYSIS===========================")
@@ -314,15 +314,12 @@ class ScovatScript:
             afile = aprof.files[name]
             if name in bprof.files:
                 bfile = bprof.files[name]
-                for f in xrange(len(afile.functions)):
-                    function(afile.functions[f],
-                             bfile.functions[f])
-                for b in xrange(len(afile.branches)):
-                    branch(afile.branches[b],
-                           bfile.branches[b])
-                for s in xrange(len(afile.statements)):
-                    statement(afile.statements[s],
-                              bfile.statements[s])
+                afile.functions = self.merge(afile.functions, bfile.functions,
+                                             function, True, True)
+                afile.branches = self.merge(afile.branches, bfile.branches,
+                                            branch, True, True)
+                afile.statements = self.merge(afile.statements, bfile.statements,
+                                              statement, True, True)
             else:
                 aprof.file_identity(name)
         for name in bprof.files:
@@ -347,15 +344,12 @@ class ScovatScript:
             afile = aprof.files[name]
             if name in bprof.files:
                 bfile = bprof.files[name]
-                for f in xrange(len(afile.functions)):
-                    function(afile.functions[f],
-                             bfile.functions[f])
-                for b in xrange(len(afile.branches)):
-                    branch(afile.branches[b],
-                           bfile.branches[b])
-                for s in xrange(len(afile.statements)):
-                    statement(afile.statements[s],
-                              bfile.statements[s])
+                afile.functions = self.merge(afile.functions, bfile.functions,
+                                             function, False, True)
+                afile.branches = self.merge(afile.branches, bfile.branches,
+                                            branch, False, True)
+                afile.statements = self.merge(afile.statements, bfile.statements,
+                                              statement, False, True)
         for name in bprof.files:
             if name not in aprof.files:
                 aprof.files[name] = bprof.files[name]
@@ -380,36 +374,101 @@ class ScovatScript:
             afile = aprof.files[name]
             if name in bprof.files:
                 bfile = bprof.files[name]
-                for f in xrange(len(afile.functions)):
-                    function(afile.functions[f],
-                             bfile.functions[f])
-                for b in xrange(len(afile.branches)):
-                    branch(afile.branches[b],
-                           bfile.branches[b])
-                for s in xrange(len(afile.statements)):
-                    statement(afile.statements[s],
-                              bfile.statements[s])
+                afile.functions = self.merge(afile.functions, bfile.functions,
+                                             function, False, False)
+                afile.branches = self.merge(afile.branches, bfile.branches,
+                                            branch, False, False)
+                afile.statements = self.merge(afile.statements, bfile.statements,
+                                              statement, False, False)
         for name in bprof.files:
             if name not in aprof.files:
                 aprof.files[name] = bprof.files[name]
 
+    def merge(self, arecords, brecords, operation, aidentity, bidentity):
+        records = []
+        # Records only found on one side are kept, zeroed if asked to.
+        for (a, b) in self.align(arecords, brecords):
+            if a is not None and b is not None:
+                operation(a, b)
+            elif a is not None and aidentity:
+                a.identity()
+            elif b is not None and bidentity:
+                b.identity()
+            records.append(a if a is not None else b)
+        return records
+
+    def align(self, arecords, brecords):
+        akeys = [r.key() for r in arecords]
+        bkeys = [r.key() for r in brecords]
+        if akeys == bkeys:  # Same layout, positions match.
+            return list(zip(arecords, brecords))
+
+        # Sort records once by key, then join them with two pointers.
+        (a, b) = (self.rank(akeys, arecords), self.rank(bkeys, brecords))
+        (i, j) = (0, 0)
+        pairs = []
+        while i < len(a) and j < len(b):
+            if a[i][0] == b[j][0]:
+                pairs.append((a[i][1], b[j][1]))
+                i += 1
+                j += 1
+            elif a[i][0] < b[j][0]:
+                pairs.append((a[i][1], None))
+                i += 1
+            else:
+                pairs.append((None, b[j][1]))
+                j += 1
+        pairs.extend((r, None) for (k, r) in a[i:])
+        pairs.extend((None, r) for (k, r) in b[j:])
+        return pairs
+
+    def rank(self, keys, records):
+        # Stable sort, so repeated keys (e.g. several branches on a line)
+        # keep their order, and are told apart by their index on the key.
+        ranked = sorted(zip(keys, records), key=lambda r: r[0])
+        (previous, index) = (None, 0)
+        for i in xrange(len(ranked)):
+            key = ranked[i][0]
+            index = index + 1 if key == previous else 0
+            ranked[i] = ((key, index), ranked[i][1])
+            previous = key
+        return ranked
+
     class Transform:
         class Statement:
             def __init__(self, line, count):
                 self.count = count
                 self.line = line
 
+            def key(self):
+                return self.line
+
+            def identity(self):
+                self.count = 0
+
         class Branch:
             def __init__(self, line, btype):
                 self.btype = btype
                 self.line = line
 
+            def key(self):
+                return self.line
+
+            def identity(self):
+                self.btype = "notexec"
+
         class Function:
             def __init__(self, line, count, name):
                 self.count = count
                 self.line = line
                 self.name = name
 
+            def key(self):
+                return (self.line, self.name)
+
+            def identity(self):
+                self.count = 0
+
         class File:
             def __init__(self, name):
                 self.branches = []
@@ -535,7 +594,7 @@ class ScovatScript:
                 self.hamming[1] += p.hamming[1]
                 self.hamming[2] += p.hamming[2]
 
-        def compare(self, af, bf):
+        def compare(self, af, bf, align):
             for name in af.files:
                 aprofile = af.files[name]
                 if name in bf.files:
@@ -544,10 +603,11 @@ class ScovatScript:
                     p = self.files[name]  # Easy access.
 
                     jaccard_hits = 0
-                    p.functions[1] = len(aprofile.functions)
-                    for f in xrange(len(aprofile.functions)):
-                        ahit = aprofile.functions[f].count > 0
-                        bhit = bprofile.functions[f].count > 0
+                    functions = align(aprofile.functions, bprofile.functions)
+                    p.functions[1] = len(functions)
+                    for (a, b) in functions:
+                        ahit = a is not None and a.count > 0
+                        bhit = b is not None and b.count > 0
                         if ahit and bhit:
                             jaccard_hits += 1
                         if ahit or bhit:
@@ -561,10 +621,11 @@ class ScovatScript:
                         self.jaccard[0][0] += jaccard_hits
 
                     jaccard_hits = 0
-                    p.branches[1] = len(aprofile.branches)
-                    for b in xrange(len(aprofile.branches)):
-                        ahit = aprofile.branches[b].btype == "taken"
-                        bhit = bprofile.branches[b].btype == "taken"
+                    branches = align(aprofile.branches, bprofile.branches)
+                    p.branches[1] = len(branches)
+                    for (a, b) in branches:
+                        ahit = a is not None and a.btype == "taken"
+                        bhit = b is not None and b.btype == "taken"
                         if ahit and bhit:
                             jaccard_hits += 1
                         if ahit or bhit:
@@ -578,10 +639,11 @@ class ScovatScript:
                         self.jaccard[1][0] += jaccard_hits
 
                     jaccard_hits = 0  # New trendy summer hits!
-                    p.statements[1] = len(aprofile.statements)
-                    for s in xrange(len(aprofile.statements)):
-                        ahit = aprofile.statements[s].count > 0
-                        bhit = bprofile.statements[s].count > 0
+                    statements = align(aprofile.statements, bprofile.statements)
+                    p.statements[1] = len(statements)
+                    for (a, b) in statements:
+                        ahit = a is not None and a.count > 0
+                        bhit = b is not None and b.count > 0
                         if ahit and bhit:
                             jaccard_hits += 1
                         if ahit or bhit:
@@ -594,11 +656,11 @@ class ScovatScript:
                         self.jaccard[2][1] += p.statements[0]
                         self.jaccard[2][0] += jaccard_hits
 
-                    self.functions[1] += len(aprofile.functions)
+                    self.functions[1] += p.functions[1]
                     self.functions[0] += p.functions[0]
-                    self.branches[1] += len(aprofile.branches)
+                    self.branches[1] += p.branches[1]
                     self.branches[0] += p.branches[0]
-                    self.statements[1] += len(aprofile.statements)
+                    self.statements[1] += p.statements[1]
                     self.statements[0] += p.statements[0]
                     self.hamming[0] += p.hamming[0]
                     self.hamming[1] += p.hamming[1]